@@ -8,6 +8,8 @@ from typing import Dict, List
 import openai
 import tiktoken
 
+from gpt_engineer.llm_cache import cached_llm
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,9 +25,10 @@ class TokenUsage:
 
 
 class AI:
-    def __init__(self, model="gpt-4", temperature=0.1):
+    def __init__(self, model="gpt-4", temperature=0.1, cache=None):
         self.temperature = temperature
         self.model = model
+        self.cache = cache
 
         # initialize token usage log
         self.cumulative_prompt_tokens = 0
@@ -60,6 +63,7 @@ class AI:
     def fassistant(self, msg):
         return {"role": "assistant", "content": msg}
 
+    @cached_llm
     def next(self, messages: List[Dict[str, str]], prompt=None, *, step_name=None):
         if prompt:
             messages += [{"role": "user", "content": prompt}]
@@ -88,9 +92,13 @@ class AI:
 
         return messages
 
-    def update_token_usage_log(self, messages, answer, step_name):
-        prompt_tokens = self.num_tokens_from_messages(messages)
-        completion_tokens = self.num_tokens(answer)
+    def update_token_usage_log(self, messages, answer, step_name, cached=False):
+        if cached:
+            # Answers served from the response cache are not billed
+            prompt_tokens = completion_tokens = 0
+        else:
+            prompt_tokens = self.num_tokens_from_messages(messages)
+            completion_tokens = self.num_tokens(answer)
         total_tokens = prompt_tokens + completion_tokens
 
         self.cumulative_prompt_tokens += prompt_tokens
@@ -1,24 +1,29 @@
 import re
 
+FILE_BLOCK_RE = re.compile(r"(\S+)\n\s*```[^\n]*\n(.+?)```", re.DOTALL)
+FORBIDDEN_CHARS_RE = re.compile(r'[<>"|?*]')
+BRACKETS_RE = re.compile(r"^\[(.*)\]$")
+BACKTICKS_RE = re.compile(r"^`(.*)`$")
+TRAILING_BRACKET_RE = re.compile(r"\]$")
+
 
 def parse_chat(chat):  # -> List[Tuple[str, str]]:
     # Get all ``` blocks and preceding filenames
-    regex = r"(\S+)\n\s*```[^\n]*\n(.+?)```"
-    matches = re.finditer(regex, chat, re.DOTALL)
+    matches = FILE_BLOCK_RE.finditer(chat)
 
     files = []
     for match in matches:
         # Strip the filename of any non-allowed characters and convert / to \
-        path = re.sub(r'[<>"|?*]', "", match.group(1))
+        path = FORBIDDEN_CHARS_RE.sub("", match.group(1))
 
         # Remove leading and trailing brackets
-        path = re.sub(r"^\[(.*)\]$", r"\1", path)
+        path = BRACKETS_RE.sub(r"\1", path)
 
         # Remove leading and trailing backticks
-        path = re.sub(r"^`(.*)`$", r"\1", path)
+        path = BACKTICKS_RE.sub(r"\1", path)
 
         # Remove trailing ]
-        path = re.sub(r"\]$", "", path)
+        path = TRAILING_BRACKET_RE.sub("", path)
 
         # Get the code
         code = match.group(2)
@@ -35,8 +40,8 @@ def parse_chat(chat):  # -> List[Tuple[str, str]]:
 
 
 def to_files(chat, workspace):
-    workspace["all_output.txt"] = chat
-
-    files = parse_chat(chat)
+    files = [("all_output.txt", chat)] + parse_chat(chat)
     for file_name, file_content in files:
-        workspace[file_name] = file_content
+        # Leave unchanged files untouched, so mtime based tools don't rebuild them
+        if workspace.get(file_name) != file_content:
+            workspace[file_name] = file_content
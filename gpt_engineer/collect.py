@@ -1,6 +1,6 @@
 import hashlib
 
-from typing import List
+from typing import Sequence
 
 from gpt_engineer import steps
 from gpt_engineer.db import DBs
@@ -21,7 +21,7 @@ def send_learning(learning: Learning):
     )
 
 
-def collect_learnings(model: str, temperature: float, steps: List[Step], dbs: DBs):
+def collect_learnings(model: str, temperature: float, steps: Sequence[Step], dbs: DBs):
     learnings = extract_learning(
         model, temperature, steps, dbs, steps_file_hash=steps_file_hash()
     )
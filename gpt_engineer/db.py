@@ -1,8 +1,9 @@
 import datetime
 import shutil
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Dict, List
 
 
 # This class represents a simple database that stores its data as files in a directory.
@@ -42,6 +43,26 @@ class DB:
             raise TypeError("val must be either a str or bytes")
 
 
+class CachedDB(DB):
+    """
+    A DB that also keeps every value it reads or writes in memory.
+    Only use it for directories that nothing else writes to during a run.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._cache = {}
+
+    def __getitem__(self, key):
+        if key not in self._cache:
+            self._cache[key] = super().__getitem__(key)
+        return self._cache[key]
+
+    def __setitem__(self, key, val):
+        super().__setitem__(key, val)
+        self._cache[key] = val
+
+
 # dataclass for all dbs:
 @dataclass
 class DBs:
@@ -51,6 +72,10 @@ class DBs:
     input: DB
     workspace: DB
     archive: DB
+    # Messages of the steps run so far, so later steps can skip parsing the logs
+    live_messages: Dict[str, List[dict]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
 
 def archive(dbs: DBs):
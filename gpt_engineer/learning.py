@@ -6,7 +6,9 @@ import tempfile
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Sequence
+
+import orjson
 
 from dataclasses_json import dataclass_json
 from termcolor import colored
@@ -153,11 +155,11 @@ def ask_if_can_store() -> bool:
     return can_store == "y"
 
 
-def logs_to_string(steps: List[Step], logs: DB):
+def logs_to_string(steps: Sequence[Step], logs: DB):
     chunks = []
     for step in steps:
         chunks.append(f"--- {step.__name__} ---\n")
-        messages = json.loads(logs[step.__name__])
+        messages = orjson.loads(logs[step.__name__])
         chunks.append(format_messages(messages))
     return "\n".join(chunks)
 
@@ -169,7 +171,7 @@ def format_messages(messages: List[dict]) -> str:
 
 
 def extract_learning(
-    model: str, temperature: float, steps: List[Step], dbs: DBs, steps_file_hash
+    model: str, temperature: float, steps: Sequence[Step], dbs: DBs, steps_file_hash
 ) -> Learning:
     review = None
     if "review" in dbs.memory:
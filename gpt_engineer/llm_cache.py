@@ -0,0 +1,91 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def cache_enabled() -> bool:
+    """The cache can be turned off for a whole session with GPTE_CACHE=off"""
+    return os.environ.get("GPTE_CACHE", "on").lower() != "off"
+
+
+def cache_key(model: str, temperature: float, messages: List[Dict[str, str]]) -> str:
+    payload = {"model": model, "temperature": temperature, "messages": messages}
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class LLMCache:
+    """A SQLite backed store of chat completions, keyed by `cache_key`."""
+
+    def __init__(self, path):
+        self.path = Path(path).absolute()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, response TEXT, created REAL)"
+        )
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT response FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def __setitem__(self, key, response):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, response, time.time()),
+            )
+
+
+def cached_llm(next_fn):
+    """
+    Serve `AI.next` from `ai.cache` when the exact same conversation has been sent
+    to the same model and temperature before. `AI.start` goes through `AI.next`, so
+    it is covered as well.
+    """
+
+    @functools.wraps(next_fn)
+    def wrapper(ai, messages, prompt=None, *, step_name=None):
+        cache = getattr(ai, "cache", None)
+        if cache is None:
+            return next_fn(ai, messages, prompt, step_name=step_name)
+
+        if prompt:
+            messages += [{"role": "user", "content": prompt}]
+
+        key = cache_key(ai.model, ai.temperature, messages)
+        response = cache.get(key)
+        if response is None:
+            messages = next_fn(ai, messages, step_name=step_name)
+            cache[key] = messages[-1]["content"]
+            return messages
+
+        logger.debug(f"Chat completion served from cache: {key}")
+        print(
+            "(Answer served from the cache, "
+            "use --no-cache or GPTE_CACHE=off for a new one)"
+        )
+        print(response)
+        messages += [{"role": "assistant", "content": response}]
+        # Keep one row per step in the token usage log, with zero tokens billed
+        ai.update_token_usage_log(
+            messages=messages, answer=response, step_name=step_name, cached=True
+        )
+        return messages
+
+    return wrapper
@@ -1,14 +1,15 @@
-import json
 import logging
 
 from pathlib import Path
 
+import orjson
 import typer
 
 from gpt_engineer.ai import AI, fallback_model
 from gpt_engineer.collect import collect_learnings
-from gpt_engineer.db import DB, DBs, archive
+from gpt_engineer.db import DB, CachedDB, DBs, archive
 from gpt_engineer.learning import collect_consent
+from gpt_engineer.llm_cache import LLMCache, cache_enabled
 from gpt_engineer.steps import STEPS, Config as StepsConfig
 
 app = typer.Typer()
@@ -23,26 +24,36 @@ def main(
         StepsConfig.DEFAULT, "--steps", "-s", help="decide which steps to run"
     ),
     verbose: bool = typer.Option(False, "--verbose", "-v"),
+    no_cache: bool = typer.Option(
+        False, "--no-cache", help="always query the model, never reuse old answers"
+    ),
 ):
     logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO)
 
+    input_path = Path(project_path).absolute()
+
+    # The cache lives next to the prompt, since memory/ is archived on every run
+    cache = None
+    if cache_enabled() and not no_cache:
+        cache = LLMCache(input_path / ".llm_cache.sqlite")
+
     model = fallback_model(model)
     ai = AI(
         model=model,
         temperature=temperature,
+        cache=cache,
     )
 
-    input_path = Path(project_path).absolute()
     memory_path = input_path / "memory"
     workspace_path = input_path / "workspace"
     archive_path = input_path / "archive"
 
     dbs = DBs(
-        memory=DB(memory_path),
+        memory=CachedDB(memory_path),
         logs=DB(memory_path / "logs"),
         input=DB(input_path),
         workspace=DB(workspace_path),
-        preprompts=DB(Path(__file__).parent / "preprompts"),
+        preprompts=CachedDB(Path(__file__).parent / "preprompts"),
         archive=DB(archive_path),
     )
 
@@ -56,7 +67,8 @@ def main(
     steps = STEPS[steps_config]
     for step in steps:
         messages = step(ai, dbs)
-        dbs.logs[step.__name__] = json.dumps(messages)
+        dbs.live_messages[step.__name__] = messages
+        dbs.logs[step.__name__] = orjson.dumps(messages).decode()
 
     if collect_consent():
         collect_learnings(model, temperature, steps, dbs)
@@ -1,23 +1,105 @@
-import inspect
-import json
+import functools
+import hashlib
 import re
 import subprocess
+import sys
 
 from enum import Enum
 from typing import List
 
+import orjson
+
 from termcolor import colored
 
 from gpt_engineer.ai import AI
 from gpt_engineer.chat_to_files import to_files
-from gpt_engineer.db import DBs
+from gpt_engineer.db import DB, DBs
 from gpt_engineer.learning import human_input
 
+# Fixed prompt texts used by the steps below
+
+CLARIFY_FOLLOW_UP = (
+    "\n\n"
+    "Is anything else unclear? If yes, only answer in the form:\n"
+    "{remaining unclear areas} remaining questions.\n"
+    "{Next question}\n"
+    'If everything is sufficiently clear, only answer "Nothing more to clarify.".'
+)
+
+FINAL_SPEC_MARKER = "=== FINAL SPEC ==="
+
+# The marker at the start of a line, allowing markdown like **...** or ### around it
+FINAL_SPEC_LINE_RE = re.compile(
+    r"^[ \t*_#`>]*" + re.escape(FINAL_SPEC_MARKER) + r"[ \t*_#`:]*(.*)$", re.MULTILINE
+)
+
+RESPEC_REVIEW_AND_REITERATE = (
+    "First give your review of the specification. "
+    f"Then, on a new line starting with {FINAL_SPEC_MARKER}, reiterate the "
+    "specification for the program. "
+    "If there are things that can be improved, please incorporate the "
+    "improvements. "
+    "If you are satisfied with the specification, just write out the "
+    "specification word by word again."
+)
+
+ENTRYPOINT_SYS_PROMPT = (
+    "You will get information about a codebase that is currently on disk in "
+    "the current folder.\n"
+    "From this you will answer with code blocks that includes all the necessary "
+    "unix terminal commands to "
+    "a) install dependencies "
+    "b) run all necessary parts of the codebase (in parallel if necessary).\n"
+    "Do not install globally. Do not use sudo.\n"
+    "Do not explain the code, just give the commands.\n"
+    "Do not use placeholders, use example values (like . for a folder argument) "
+    "if necessary.\n"
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _sys_prompt(preprompts: DB) -> str:
+    return "".join(
+        (preprompts["generate"], "\nUseful to know:\n", preprompts["philosophy"])
+    )
+
 
 def setup_sys_prompt(dbs: DBs) -> str:
-    return (
-        dbs.preprompts["generate"] + "\nUseful to know:\n" + dbs.preprompts["philosophy"]
-    )
+    # Built once per preprompts DB, the preprompts don't change during a run
+    return _sys_prompt(dbs.preprompts)
+
+
+def build_prefix(ai: AI, dbs: DBs, specification: bool = False) -> List[dict]:
+    """
+    The static messages that steps start with. Keeping them byte-identical across
+    steps lets the provider reuse its prompt cache for this prefix.
+    """
+    messages = [
+        ai.fsystem(setup_sys_prompt(dbs)),
+        ai.fuser(f"Instructions: {dbs.input['prompt']}"),
+    ]
+    if specification:
+        messages.append(ai.fuser(f"Specification:\n\n{dbs.memory['specification']}"))
+    return messages
+
+
+def load_messages(dbs: DBs, step_name: str) -> List[dict]:
+    """Messages of an earlier step, from this run if possible, else from its log"""
+    if step_name in dbs.live_messages:
+        return list(dbs.live_messages[step_name])
+    return orjson.loads(dbs.logs[step_name])
+
+
+def extract_final_spec(answer: str) -> str:
+    """The specification after the last FINAL_SPEC_MARKER line, or the whole answer"""
+    matches = list(FINAL_SPEC_LINE_RE.finditer(answer))
+    if not matches:
+        return answer
+
+    last = matches[-1]
+    spec = (last.group(1) + answer[last.end() :]).strip()
+    # An answer cut off right after the marker keeps the whole answer
+    return spec or answer
 
 
 def get_prompt(dbs: DBs) -> str:
@@ -38,7 +120,32 @@ def get_prompt(dbs: DBs) -> str:
 
 def curr_fn() -> str:
     """Get the name of the current function"""
-    return inspect.stack()[1].function
+    return sys._getframe(1).f_code.co_name
+
+
+def extract_code_blocks(chat: str) -> List[str]:
+    """Return the contents of all ``` fenced blocks, without the language tag line"""
+    blocks = []
+    i = 0
+    while True:
+        start = chat.find("```", i)
+        if start < 0:
+            break
+        newline = chat.find("\n", start + 3)
+        if newline < 0:
+            break
+        # Like ```\S*\n: an opening fence has a tag without spaces, else it is prose
+        tag = chat[start + 3 : newline]
+        if any(c.isspace() for c in tag):
+            i = start + 3
+            continue
+        # The block has at least one character, as with (.+?)
+        end = chat.find("```", newline + 2)
+        if end < 0:
+            break
+        blocks.append(chat[newline + 1 : end])
+        i = end + 3
+    return blocks
 
 
 # All steps below have the signature Step
@@ -60,10 +167,11 @@ def clarify(ai: AI, dbs: DBs) -> List[dict]:
     while True:
         messages = ai.next(messages, user_input, step_name=curr_fn())
 
-        if messages[-1]["content"].strip() == "Nothing more to clarify.":
+        msg = messages[-1]["content"].strip()
+        if msg == "Nothing more to clarify.":
             break
 
-        if messages[-1]["content"].strip().lower().startswith("no"):
+        if msg.lower().startswith("no"):
             print("Nothing more to clarify.")
             break
 
@@ -82,13 +190,7 @@ def clarify(ai: AI, dbs: DBs) -> List[dict]:
             print()
             return messages
 
-        user_input += (
-            "\n\n"
-            "Is anything else unclear? If yes, only answer in the form:\n"
-            "{remaining unclear areas} remaining questions.\n"
-            "{Next question}\n"
-            'If everything is sufficiently clear, only answer "Nothing more to clarify.".'
-        )
+        user_input += CLARIFY_FOLLOW_UP
 
     print()
     return messages
@@ -99,10 +201,7 @@ def gen_spec(ai: AI, dbs: DBs) -> List[dict]:
     Generate a spec from the main prompt + clarifications and save the results to
     the workspace
     """
-    messages = [
-        ai.fsystem(setup_sys_prompt(dbs)),
-        ai.fsystem(f"Instructions: {dbs.input['prompt']}"),
-    ]
+    messages = build_prefix(ai, dbs)
 
     messages = ai.next(messages, dbs.preprompts["spec"], step_name=curr_fn())
 
@@ -112,24 +211,13 @@ def gen_spec(ai: AI, dbs: DBs) -> List[dict]:
 
 
 def respec(ai: AI, dbs: DBs) -> List[dict]:
-    messages = json.loads(dbs.logs[gen_spec.__name__])
+    messages = load_messages(dbs, gen_spec.__name__)
     messages += [ai.fsystem(dbs.preprompts["respec"])]
 
-    messages = ai.next(messages, step_name=curr_fn())
-    messages = ai.next(
-        messages,
-        (
-            "Based on the conversation so far, please reiterate the specification for "
-            "the program. "
-            "If there are things that can be improved, please incorporate the "
-            "improvements. "
-            "If you are satisfied with the specification, just write out the "
-            "specification word by word again."
-        ),
-        step_name=curr_fn(),
-    )
+    # Review and reiterate in a single request, the spec follows the marker
+    messages = ai.next(messages, RESPEC_REVIEW_AND_REITERATE, step_name=curr_fn())
 
-    dbs.memory["specification"] = messages[-1]["content"]
+    dbs.memory["specification"] = extract_final_spec(messages[-1]["content"])
     return messages
 
 
@@ -137,11 +225,7 @@ def gen_unit_tests(ai: AI, dbs: DBs) -> List[dict]:
     """
     Generate unit tests based on the specification, that should work.
     """
-    messages = [
-        ai.fsystem(setup_sys_prompt(dbs)),
-        ai.fuser(f"Instructions: {dbs.input['prompt']}"),
-        ai.fuser(f"Specification:\n\n{dbs.memory['specification']}"),
-    ]
+    messages = build_prefix(ai, dbs, specification=True)
 
     messages = ai.next(messages, dbs.preprompts["unit_tests"], step_name=curr_fn())
 
@@ -153,7 +237,7 @@ def gen_unit_tests(ai: AI, dbs: DBs) -> List[dict]:
 
 def gen_clarified_code(ai: AI, dbs: DBs) -> List[dict]:
     """Takes clarification and generates code"""
-    messages = json.loads(dbs.logs[clarify.__name__])
+    messages = load_messages(dbs, clarify.__name__)
 
     messages = [
         ai.fsystem(setup_sys_prompt(dbs)),
@@ -166,10 +250,7 @@ def gen_clarified_code(ai: AI, dbs: DBs) -> List[dict]:
 
 def gen_code(ai: AI, dbs: DBs) -> List[dict]:
     # get the messages from previous step
-    messages = [
-        ai.fsystem(setup_sys_prompt(dbs)),
-        ai.fuser(f"Instructions: {dbs.input['prompt']}"),
-        ai.fuser(f"Specification:\n\n{dbs.memory['specification']}"),
+    messages = build_prefix(ai, dbs, specification=True) + [
         ai.fuser(f"Unit tests:\n\n{dbs.memory['unit_tests']}"),
     ]
     messages = ai.next(messages, dbs.preprompts["use_qa"], step_name=curr_fn())
@@ -180,35 +261,30 @@ def gen_code(ai: AI, dbs: DBs) -> List[dict]:
 def execute_entrypoint(ai: AI, dbs: DBs) -> List[dict]:
     command = dbs.workspace["run.sh"]
 
-    print("Do you want to execute this code?")
-    print()
-    print(command)
-    print()
-    print('If yes, press enter. Otherwise, type "no"')
-    print()
+    print(
+        "Do you want to execute this code?\n\n"
+        f"{command}\n\n"
+        'If yes, press enter. Otherwise, type "no"\n'
+    )
     if input() not in ["", "y", "yes"]:
         print("Ok, not executing the code.")
         return []
-    print("Executing the code...")
-    print()
+    note = colored(
+        "Note: If it does not work as expected, consider running the code"
+        + " in another way than above.",
+        "green",
+    )
     print(
-        colored(
-            "Note: If it does not work as expected, consider running the code"
-            + " in another way than above.",
-            "green",
-        )
+        "Executing the code...\n\n"
+        f"{note}\n\n"
+        "You can press ctrl+c *once* to stop the execution.\n"
     )
-    print()
-    print("You can press ctrl+c *once* to stop the execution.")
-    print()
 
-    p = subprocess.Popen("bash run.sh", shell=True, cwd=dbs.workspace.path)
+    p = subprocess.Popen(["bash", "run.sh"], cwd=dbs.workspace.path)
     try:
         p.wait()
     except KeyboardInterrupt:
-        print()
-        print("Stopping execution.")
-        print("Execution stopped.")
+        print("\nStopping execution.\nExecution stopped.")
         p.kill()
         print()
 
@@ -216,34 +292,31 @@ def execute_entrypoint(ai: AI, dbs: DBs) -> List[dict]:
 
 
 def gen_entrypoint(ai: AI, dbs: DBs) -> List[dict]:
+    code = dbs.workspace["all_output.txt"]
+    code_hash = hashlib.blake2b(code.encode(), digest_size=16).hexdigest()
+    if "run.sh" in dbs.workspace and dbs.memory.get("entrypoint_code_hash") == code_hash:
+        print("The code has not changed since run.sh was generated, reusing it.")
+        print()
+        # No conversation took place in this run, log the step with zero tokens
+        ai.update_token_usage_log(
+            messages=[], answer="", step_name=curr_fn(), cached=True
+        )
+        return []
+
     messages = ai.start(
-        system=(
-            "You will get information about a codebase that is currently on disk in "
-            "the current folder.\n"
-            "From this you will answer with code blocks that includes all the necessary "
-            "unix terminal commands to "
-            "a) install dependencies "
-            "b) run all necessary parts of the codebase (in parallel if necessary).\n"
-            "Do not install globally. Do not use sudo.\n"
-            "Do not explain the code, just give the commands.\n"
-            "Do not use placeholders, use example values (like . for a folder argument) "
-            "if necessary.\n"
-        ),
-        user="Information about the codebase:\n\n" + dbs.workspace["all_output.txt"],
+        system=ENTRYPOINT_SYS_PROMPT,
+        user="Information about the codebase:\n\n" + code,
         step_name=curr_fn(),
     )
     print()
 
-    regex = r"```\S*\n(.+?)```"
-    matches = re.finditer(regex, messages[-1]["content"], re.DOTALL)
-    dbs.workspace["run.sh"] = "\n".join(match.group(1) for match in matches)
+    dbs.workspace["run.sh"] = "\n".join(extract_code_blocks(messages[-1]["content"]))
+    dbs.memory["entrypoint_code_hash"] = code_hash
     return messages
 
 
 def use_feedback(ai: AI, dbs: DBs):
-    messages = [
-        ai.fsystem(setup_sys_prompt(dbs)),
-        ai.fuser(f"Instructions: {dbs.input['prompt']}"),
+    messages = build_prefix(ai, dbs) + [
         ai.fassistant(dbs.workspace["all_output.txt"]),
         ai.fsystem(dbs.preprompts["use_feedback"]),
     ]
@@ -253,10 +326,8 @@ def use_feedback(ai: AI, dbs: DBs):
 
 
 def fix_code(ai: AI, dbs: DBs):
-    code_output = json.loads(dbs.logs[gen_code.__name__])[-1]["content"]
-    messages = [
-        ai.fsystem(setup_sys_prompt(dbs)),
-        ai.fuser(f"Instructions: {dbs.input['prompt']}"),
+    code_output = load_messages(dbs, gen_code.__name__)[-1]["content"]
+    messages = build_prefix(ai, dbs) + [
         ai.fuser(code_output),
         ai.fsystem(dbs.preprompts["fix_code"]),
     ]
@@ -288,24 +359,24 @@ class Config(str, Enum):
 
 # Different configs of what steps to run
 STEPS = {
-    Config.DEFAULT: [
+    Config.DEFAULT: (
         clarify,
         gen_clarified_code,
         gen_entrypoint,
         execute_entrypoint,
         human_review,
-    ],
-    Config.BENCHMARK: [simple_gen, gen_entrypoint],
-    Config.SIMPLE: [simple_gen, gen_entrypoint, execute_entrypoint],
-    Config.TDD: [
+    ),
+    Config.BENCHMARK: (simple_gen, gen_entrypoint),
+    Config.SIMPLE: (simple_gen, gen_entrypoint, execute_entrypoint),
+    Config.TDD: (
         gen_spec,
         gen_unit_tests,
         gen_code,
         gen_entrypoint,
         execute_entrypoint,
         human_review,
-    ],
-    Config.TDD_PLUS: [
+    ),
+    Config.TDD_PLUS: (
         gen_spec,
         gen_unit_tests,
         gen_code,
@@ -313,15 +384,15 @@ STEPS = {
         gen_entrypoint,
         execute_entrypoint,
         human_review,
-    ],
-    Config.CLARIFY: [
+    ),
+    Config.CLARIFY: (
         clarify,
         gen_clarified_code,
         gen_entrypoint,
         execute_entrypoint,
         human_review,
-    ],
-    Config.RESPEC: [
+    ),
+    Config.RESPEC: (
         gen_spec,
         respec,
         gen_unit_tests,
@@ -330,10 +401,10 @@ STEPS = {
         gen_entrypoint,
         execute_entrypoint,
         human_review,
-    ],
-    Config.USE_FEEDBACK: [use_feedback, gen_entrypoint, execute_entrypoint, human_review],
-    Config.EXECUTE_ONLY: [execute_entrypoint],
-    Config.EVALUATE: [execute_entrypoint, human_review],
+    ),
+    Config.USE_FEEDBACK: (use_feedback, gen_entrypoint, execute_entrypoint, human_review),
+    Config.EXECUTE_ONLY: (execute_entrypoint,),
+    Config.EVALUATE: (execute_entrypoint, human_review),
 }
 
 # Future steps that can be added:
@@ -0,0 +1,9 @@
+import pytest
+
+from gpt_engineer.db import DB, DBs
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    dir_names = ["memory", "logs", "preprompts", "input", "workspace", "archive"]
+    return DBs(*(DB(tmp_path / name) for name in dir_names))
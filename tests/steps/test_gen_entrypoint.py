@@ -0,0 +1,99 @@
+import json
+import re
+import textwrap
+
+from gpt_engineer.steps import extract_code_blocks, gen_entrypoint
+
+
+def test_extract_code_blocks():
+    chat = textwrap.dedent(
+        """
+    Install the dependencies:
+
+    ```bash
+    pip install -r requirements.txt
+    ```
+
+    Then run the program:
+
+    ```
+    python main.py &
+    python worker.py
+    ```
+    """
+    )
+
+    assert extract_code_blocks(chat) == [
+        "pip install -r requirements.txt\n",
+        "python main.py &\npython worker.py\n",
+    ]
+
+
+def test_extract_code_blocks_skips_backticks_in_prose():
+    chat = "Run ``` inline ``` then\n```sh\necho hi\n```\n"
+
+    assert extract_code_blocks(chat) == ["echo hi\n"]
+
+
+def test_extract_code_blocks_matches_regex():
+    regex = re.compile(r"```\S*\n(.+?)```", re.DOTALL)
+    chats = [
+        "Run ``` inline ``` then\n```sh\necho hi\n```\n",
+        "```\n```\nx\n```\n",
+        "```sh\na\n```\ntext\n```bash\nb\n```\n",
+        "```\na```",
+    ]
+
+    for chat in chats:
+        expected = [match.group(1) for match in regex.finditer(chat)]
+        assert extract_code_blocks(chat) == expected, chat
+
+
+def test_extract_code_blocks_unterminated():
+    assert extract_code_blocks("no code here") == []
+    assert extract_code_blocks("```bash") == []
+    assert extract_code_blocks("```bash\nnever closed") == []
+
+
+class FakeAI:
+    def __init__(self):
+        self.calls = 0
+        self.token_usage_log = []
+
+    def update_token_usage_log(self, messages, answer, step_name, cached=False):
+        self.token_usage_log.append((step_name, cached))
+
+    def start(self, system, user, step_name):
+        self.calls += 1
+        answer = "```sh\npython main.py\n```\n"
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+            {"role": "assistant", "content": answer},
+        ]
+
+
+def test_gen_entrypoint_reuses_run_sh(dbs):
+    dbs.workspace["all_output.txt"] = "main.py\n```python\nprint('hi')\n```\n"
+    ai = FakeAI()
+
+    messages = gen_entrypoint(ai, dbs)
+    assert ai.calls == 1
+    assert dbs.workspace["run.sh"] == "python main.py\n"
+
+    # Same code and run.sh present: no conversation, but a zero-token row is
+    # logged, and an earlier run's log is not passed off as this run's
+    dbs.logs["gen_entrypoint"] = json.dumps(messages)
+    assert gen_entrypoint(ai, dbs) == []
+    assert ai.calls == 1
+    assert ai.token_usage_log == [("gen_entrypoint", True)]
+
+    # run.sh is regenerated when it is missing
+    (dbs.workspace.path / "run.sh").unlink()
+    gen_entrypoint(ai, dbs)
+    assert ai.calls == 2
+
+    # or when the code changed
+    dbs.workspace["all_output.txt"] = "changed"
+    gen_entrypoint(ai, dbs)
+    assert ai.calls == 3
@@ -0,0 +1,20 @@
+import json
+
+from gpt_engineer.steps import load_messages
+
+
+def test_load_messages(dbs):
+    logged = [{"role": "user", "content": "from the log"}]
+    dbs.logs["gen_spec"] = json.dumps(logged)
+
+    # Falls back to the log, e.g. when resuming from an earlier run
+    assert load_messages(dbs, "gen_spec") == logged
+
+    live = [{"role": "user", "content": "from this run"}]
+    dbs.live_messages["gen_spec"] = live
+    messages = load_messages(dbs, "gen_spec")
+    assert messages == live
+
+    # Steps extend the returned list, which must not change the stored one
+    messages += [{"role": "assistant", "content": "answer"}]
+    assert len(dbs.live_messages["gen_spec"]) == 1
@@ -0,0 +1,45 @@
+from gpt_engineer.steps import extract_final_spec
+
+
+def test_extract_final_spec():
+    answer = "The spec misses error handling.\n=== FINAL SPEC ===\nThe program...\n"
+
+    assert extract_final_spec(answer) == "The program..."
+
+
+def test_extract_final_spec_without_marker():
+    answer = "The program...\n"
+
+    assert extract_final_spec(answer) == answer
+
+
+def test_extract_final_spec_decorated_marker():
+    for line in [
+        "**=== FINAL SPEC ===**",
+        "### === FINAL SPEC ===",
+        "`=== FINAL SPEC ===`",
+    ]:
+        answer = f"Looks good.\n\n{line}\n\nThe program...\n"
+        assert extract_final_spec(answer) == "The program...", line
+
+    # The spec may also start on the marker line itself
+    answer = "Looks good.\n=== FINAL SPEC === The program...\nMore details.\n"
+    assert extract_final_spec(answer) == "The program...\nMore details."
+
+
+def test_extract_final_spec_uses_last_marker_line():
+    answer = (
+        "I will put it after === FINAL SPEC === below.\n"
+        "=== FINAL SPEC ===\n"
+        "Draft\n"
+        "=== FINAL SPEC ===\n"
+        "Spec\n"
+    )
+
+    assert extract_final_spec(answer) == "Spec"
+
+
+def test_extract_final_spec_empty_after_marker():
+    answer = "The spec misses error handling.\n=== FINAL SPEC ===\n"
+
+    assert extract_final_spec(answer) == answer
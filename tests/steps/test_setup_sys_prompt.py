@@ -0,0 +1,25 @@
+import pytest
+
+from gpt_engineer.steps import setup_sys_prompt
+
+
+def test_setup_sys_prompt_is_built_once(dbs):
+    # A plain DB reads the files on every lookup, so only the memoization can
+    # explain the old prompt coming back below
+    preprompts = dbs.preprompts
+    preprompts["generate"] = "GEN"
+    preprompts["philosophy"] = "PHIL"
+
+    assert setup_sys_prompt(dbs) == "GEN\nUseful to know:\nPHIL"
+
+    # The preprompts are fixed for a run, later calls don't look at the files
+    preprompts["generate"] = "CHANGED"
+    assert setup_sys_prompt(dbs) == "GEN\nUseful to know:\nPHIL"
+
+
+def test_setup_sys_prompt_missing_preprompt(dbs):
+    preprompts = dbs.preprompts
+    preprompts["generate"] = "GEN"
+
+    with pytest.raises(KeyError):
+        setup_sys_prompt(dbs)
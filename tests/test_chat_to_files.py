@@ -198,3 +198,37 @@ def test_files_with_newline_between_header():
 
     for file_name, file_content in expected_files.items():
         assert workspace[file_name] == file_content
+
+
+def test_to_files_skips_unchanged_files():
+    chat = textwrap.dedent(
+        """
+    This is a sample program.
+
+    file1.py
+    ```python
+    print("Hello, World!")
+    ```
+    """
+    )
+
+    class Workspace(dict):
+        def __init__(self):
+            super().__init__()
+            self.writes = []
+
+        def __setitem__(self, key, val):
+            self.writes.append(key)
+            super().__setitem__(key, val)
+
+    workspace = Workspace()
+    to_files(chat, workspace)
+    assert sorted(workspace.writes) == ["README.md", "all_output.txt", "file1.py"]
+
+    workspace.writes.clear()
+    to_files(chat, workspace)
+    assert workspace.writes == []
+
+    workspace.writes.clear()
+    to_files(chat.replace("Hello", "Bye"), workspace)
+    assert sorted(workspace.writes) == ["all_output.txt", "file1.py"]
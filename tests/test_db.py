@@ -1,6 +1,6 @@
 import pytest
 
-from gpt_engineer.db import DB, DBs
+from gpt_engineer.db import DB, CachedDB, DBs
 
 
 def test_DB_operations(tmp_path):
@@ -26,6 +26,31 @@ def test_DB_operations(tmp_path):
         db["key"] = ["Invalid", "value"]
 
 
+def test_CachedDB_operations(tmp_path):
+    db = CachedDB(tmp_path)
+
+    # Writes go through to disk
+    db["test_key"] = "test_value"
+    assert (tmp_path / "test_key").read_text() == "test_value"
+
+    # Reads are served from memory once a value is known
+    (tmp_path / "test_key").write_text("changed on disk")
+    assert db["test_key"] == "test_value"
+
+    # Values that were never written are read from disk once
+    (tmp_path / "other_key").write_text("other_value")
+    assert db["other_key"] == "other_value"
+    (tmp_path / "other_key").unlink()
+    assert db["other_key"] == "other_value"
+
+    with pytest.raises(KeyError):
+        db["non_existent"]
+
+    with pytest.raises(TypeError):
+        db["key"] = ["Invalid", "value"]
+    assert db.get("key") is None
+
+
 def test_DBs_initialization(tmp_path):
     dir_names = ["memory", "logs", "preprompts", "input", "workspace", "archive"]
     directories = [tmp_path / name for name in dir_names]
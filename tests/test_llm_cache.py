@@ -0,0 +1,87 @@
+import openai
+import tiktoken
+
+from gpt_engineer.ai import AI
+from gpt_engineer.llm_cache import LLMCache, cache_key, cached_llm
+
+
+class FakeAI:
+    def __init__(self, cache):
+        self.model = "test_model"
+        self.temperature = 0.1
+        self.cache = cache
+        self.calls = 0
+
+    @cached_llm
+    def next(self, messages, prompt=None, *, step_name=None):
+        if prompt:
+            messages += [{"role": "user", "content": prompt}]
+        self.calls += 1
+        messages += [{"role": "assistant", "content": f"answer {self.calls}"}]
+        return messages
+
+    def update_token_usage_log(self, messages, answer, step_name, cached=False):
+        pass
+
+
+def test_cache_roundtrip(tmp_path):
+    cache = LLMCache(tmp_path / "cache.sqlite")
+    key = cache_key("test_model", 0.1, [{"role": "user", "content": "hi"}])
+
+    assert cache.get(key) is None
+    cache[key] = "hello"
+    assert key in cache
+
+    # Entries survive reopening the database
+    assert LLMCache(tmp_path / "cache.sqlite").get(key) == "hello"
+
+
+def test_cached_llm_serves_repeated_conversations(tmp_path, capsys):
+    ai = FakeAI(LLMCache(tmp_path / "cache.sqlite"))
+    system = {"role": "system", "content": "be brief"}
+
+    first = ai.next([system], "hi", step_name="test")
+    assert "served from the cache" not in capsys.readouterr().out
+    second = ai.next([system], "hi", step_name="test")
+    assert "--no-cache" in capsys.readouterr().out
+
+    assert ai.calls == 1
+    assert first == second
+    assert second[-1] == {"role": "assistant", "content": "answer 1"}
+
+    ai.next([system], "something else", step_name="test")
+    assert ai.calls == 2
+
+
+def test_cached_llm_without_cache(tmp_path):
+    ai = FakeAI(None)
+
+    ai.next([], "hi")
+    ai.next([], "hi")
+
+    assert ai.calls == 2
+
+
+def test_cache_hit_is_logged_without_tokens(tmp_path, monkeypatch):
+    class Tokenizer:
+        def encode(self, txt):
+            return txt.split()
+
+    def create(**kwargs):
+        return iter([{"choices": [{"delta": {"content": "an answer"}}]}])
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda model: Tokenizer())
+    monkeypatch.setattr(openai.ChatCompletion, "create", create)
+
+    ai = AI(model="test_model", cache=LLMCache(tmp_path / "cache.sqlite"))
+    ai.start("be brief", "hi", step_name="first")
+    ai.start("be brief", "hi", step_name="second")
+
+    first, second = ai.token_usage_log
+    assert first.step_name == "first"
+    assert first.in_step_total_tokens > 0
+
+    assert second.step_name == "second"
+    assert second.in_step_prompt_tokens == 0
+    assert second.in_step_completion_tokens == 0
+    assert second.total_tokens == first.total_tokens